@@ -336,6 +336,7 @@ async def async_unload_entry(hass: hass_core.HomeAssistant, config_entry: config
     if unload_ok:
         hass.data[DOMAIN].pop(config_entry.entry_id, None)
         hass.data[DOMAIN]['sub_entities'] = {}
+        hass.data[DOMAIN].get('device_log_coordinators', {}).pop(config_entry.entry_id, None)
     return unload_ok
 
 
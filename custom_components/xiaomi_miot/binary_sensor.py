@@ -1,11 +1,13 @@
 """Support for Xiaomi binary sensors."""
 import logging
 import time
-import json
-from functools import partial
-from datetime import datetime
+import struct
+from datetime import datetime, timedelta
 
 from homeassistant.const import *  # noqa: F401
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.components.binary_sensor import (
     DOMAIN as ENTITY_DOMAIN,
     BinarySensorEntity,
@@ -33,11 +35,30 @@ from .core.xiaomi_cloud import MiotCloud
 from .fan import MiotModesSubEntity
 from .switch import SwitchSubEntity
 
+try:
+    from orjson import loads as json_loads
+except (ModuleNotFoundError, ImportError):
+    from json import loads as json_loads
+
 _LOGGER = logging.getLogger(__name__)
 DATA_KEY = f'{ENTITY_DOMAIN}.{DOMAIN}'
 
 SERVICE_TO_METHOD = {}
 
+# little-endian unpackers for the common widths of ble object values
+BLE_VALUE_UNPACKERS = {
+    1: struct.Struct('<B').unpack_from,
+    2: struct.Struct('<H').unpack_from,
+    4: struct.Struct('<I').unpack_from,
+}
+
+
+def ble_value_to_int(val):
+    raw = bytes.fromhex(val)
+    if fun := BLE_VALUE_UNPACKERS.get(len(raw)):
+        return fun(raw)[0]
+    return int.from_bytes(raw, 'little')
+
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     await async_setup_config_entry(hass, config_entry, async_setup_platform, async_add_entities, ENTITY_DOMAIN)
@@ -52,8 +73,9 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
     miot = config.get('miot_type')
     if miot:
         spec = await MiotSpec.async_from_type(hass, miot)
+        nobody_time = spec.get_service('nobody_time')
         for srv in spec.get_services('toilet', 'seat', 'motion_sensor', 'magnet_sensor', 'submersion_sensor'):
-            if spec.get_service('nobody_time'):
+            if nobody_time:
                 # lumi.motion.agl02
                 # lumi.motion.agl04
                 pass
@@ -66,9 +88,9 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
             elif srv.name in ['seat'] and spec.name in ['toilet']:
                 # tinymu.toiletlid.v1
                 entities.append(MiotToiletEntity(config, srv))
-            elif 'blt.' in did:
+            elif did.startswith('blt.'):
                 entities.append(BleBinarySensorEntity(config, srv))
-            elif 'lumi.' in model:
+            elif model.startswith('lumi.'):
                 entities.append(LumiBinarySensorEntity(config, srv))
             else:
                 entities.append(MiotBinarySensorEntity(config, srv))
@@ -109,11 +131,16 @@ class MiotBinarySensorEntity(MiotToggleEntity, BinarySensorEntity):
             self._prop_state = miot_service.get_property('submersion_state') or self._prop_state
             self._vars['device_class'] = DEVICE_CLASS_MOISTURE
 
-        self._state_attrs.update({
-            'state_property': self._prop_state.full_name if self._prop_state else None,
-        })
+        self._state_attrs['state_property'] = self._prop_state.full_name if self._prop_state else None
+        self._reverse_state = None
+        self._motion_timeout = None
+
+    def _update_custom_configs(self):
+        self._reverse_state = self.custom_config_bool('reverse_state')
+        self._motion_timeout = self.custom_config_integer('motion_timeout')
 
     async def async_update(self):
+        self._update_custom_configs()
         await super().async_update()
         if not self._available:
             return
@@ -126,10 +153,10 @@ class MiotBinarySensorEntity(MiotToggleEntity, BinarySensorEntity):
         val = self._prop_state.from_dict(self._state_attrs)
         if val is None:
             return self._state
-        if self.custom_config_bool('reverse_state'):
+        if self._reverse_state:
             return not val;
         if self._prop_state.name in ['no_motion_duration', 'nobody_time']:
-            dur = self.custom_config_integer('motion_timeout')
+            dur = self._motion_timeout
             if dur is None and self._prop_state.value_range:
                 stp = self._prop_state.range_step()
                 if stp >= 10:
@@ -150,26 +177,37 @@ class MiotBinarySensorEntity(MiotToggleEntity, BinarySensorEntity):
     def device_class(self):
         return self._vars.get('device_class') or super().device_class
 
+    def update_trigger_time(self, tim, adt: dict):
+        adt['trigger_time'] = tim
+        if tim != self._state_attrs.get('trigger_time'):
+            # format only when changed, sensor sub entities read trigger_at from state attrs
+            adt['trigger_at'] = f'{datetime.fromtimestamp(tim)}'
+
 
 class BleBinarySensorEntity(MiotBinarySensorEntity):
+    # https://iot.mi.com/new/doc/embedded-development/ble/object-definition
+    _PROPS = (
+        'event.15',   # 0x000F motion&illumination
+        'prop.4103',  # 0x1007 lux
+        'prop.4106',  # 0x100A battery
+        'prop.4117',  # 0x1015 smoke
+        'prop.4119',  # 0x1017 no_motion_duration
+        'prop.4123',  # 0x101B no_motion_timeout
+        'prop.4120',  # 0x1018 illumination_level
+        'prop.4121',  # 0x1019 magnet
+    )
+
     def __init__(self, config, miot_service: MiotService):
         super().__init__(config, miot_service)
         self._prop_illumination = miot_service.get_property('illumination')
         if not self._prop_illumination:
             if srv := miot_service.spec.get_service('illumination_sensor'):
                 self._prop_illumination = srv.get_property('illumination')
+        self._motion_off_listener = None
 
-        # https://iot.mi.com/new/doc/embedded-development/ble/object-definition
-        self._props = [
-            'event.15',   # 0x000F motion&illumination
-            'prop.4103',  # 0x1007 lux
-            'prop.4106',  # 0x100A battery
-            'prop.4117',  # 0x1015 smoke
-            'prop.4119',  # 0x1017 no_motion_duration
-            'prop.4123',  # 0x101B no_motion_timeout
-            'prop.4120',  # 0x1018 illumination_level
-            'prop.4121',  # 0x1019 magnet
-        ]
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        self.async_on_remove(self._cancel_motion_off)
 
     async def async_update(self):
         await super().async_update()
@@ -183,81 +221,110 @@ class BleBinarySensorEntity(MiotBinarySensorEntity):
         mic = self.miot_cloud
         if not did or not isinstance(mic, MiotCloud):
             return
-        pms = {
-            'did': did,
-            'props': self._props,
-        }
-        rdt = await self.hass.async_add_executor_job(
-            mic.request_miot_api, 'device/batchdevicedatas', [pms],
-        ) or {}
-        self.logger.debug('%s: Got miio cloud props: %s', self.name, rdt)
-        props = (rdt.get('result') or {}).get(did, {})
+        props = await mic.batch_device_datas.async_enqueue(did, self._PROPS)
+        self.logger.debug('%s: Got miio cloud props: %s', self.name, props)
+        now = time.time()
         sta = None
         adt = {}
+        evs = {
+            k: json_loads(v)
+            for k, v in props.items()
+            if v and 'event.' in k
+        }
         for k, v in props.items():
             if v is None:
                 continue
+            handler = self._HANDLERS.get(k)
+            if not handler:
+                continue
             ise = 'event.' in k
-            evt = json.loads(v) if ise else {'value': [v]}
+            evt = (evs.get(k) or {}) if ise else {'value': [v]}
             tim = float(evt.get('timestamp') or 0)
-            val = vlk = None
+            val = None
             if vls := evt.get('value'):
                 val = vls[0]
             if val:
                 try:
-                    val = int.from_bytes(bytes.fromhex(val), 'little')
+                    val = ble_value_to_int(val)
                 except (TypeError, ValueError):
                     val = None
                     self.logger.warning('%s: BLE object data invalid: %s (%s)', self.name, k, vls)
             if ise and not tim:
                 continue
-
-            # https://iot.mi.com/new/doc/embedded-development/ble/object-definition#%E6%9C%89%E4%BA%BA%E7%A7%BB%E5%8A%A8%E4%BA%8B%E4%BB%B6%EF%BC%88%E5%B8%A6%E5%85%89%E7%85%A7%EF%BC%89
-            if k == 'event.15':
-                adt.update({
-                    'trigger_time': tim,
-                    'trigger_at': f'{datetime.fromtimestamp(tim)}',
-                })
-                dif = time.time() - adt['trigger_time']
-                sta = dif <= (self.custom_config_integer('motion_timeout') or 60)
-                vlk = 'illumination'
-                if self._prop_illumination and self._prop_illumination.value_range:
-                    vlk = self._prop_illumination.full_name
-
-            # https://iot.mi.com/new/doc/embedded-development/ble/object-definition#%E5%85%89%E7%85%A7%E5%BA%A6%E5%B1%9E%E6%80%A7
-            elif k == 'prop.4103':
-                vlk = 'illumination'
-                if self._prop_illumination and self._prop_illumination.value_range:
-                    vlk = self._prop_illumination.full_name
-
-            # https://iot.mi.com/new/doc/embedded-development/ble/object-definition#%E6%97%A0%E4%BA%BA%E7%A7%BB%E5%8A%A8%E5%B1%9E%E6%80%A7
-            elif k == 'prop.4119':
-                if prop := self._miot_service.get_property('no_motion_duration'):
-                    vlk = prop.full_name
-                else:
-                    vlk = 'no_motion_duration'
-
-            # https://iot.mi.com/new/doc/embedded-development/ble/object-definition#%E5%85%89%E7%85%A7%E5%BC%BA%E5%BC%B1%E5%B1%9E%E6%80%A7
-            elif k == 'prop.4120':
-                adt['light_strong'] = not not val
-                vlk = 'illumination_level'
-                val = 'strong' if val else 'weak'
-                if self._prop_illumination and self._prop_illumination.value_list:
-                    vid = self._prop_illumination.list_value(val)
-                    if vid is not None:
-                        adt[self._prop_illumination.full_name] = vid
-
-            # https://iot.mi.com/new/doc/embedded-development/ble/object-definition#%E9%97%A8%E7%A3%81%E5%B1%9E%E6%80%A7
-            elif k == 'prop.4121':
-                sta = val != 2
-
+            vlk, val, kst = handler(self, val, tim, now, adt)
+            if kst is not None:
+                sta = kst
             if vlk is not None and val is not None:
                 adt[vlk] = val
+        tim = adt.get('trigger_time')
+        if sta and tim and tim != self._state_attrs.get('trigger_time'):
+            self._schedule_motion_off(tim + (self._motion_timeout or 60) - now)
         if sta is not None:
             self._state = sta
         if adt:
             self.update_attrs(adt)
 
+    def _schedule_motion_off(self, delay):
+        self._cancel_motion_off()
+        self._motion_off_listener = async_call_later(self.hass, max(0, delay), self._async_motion_off)
+
+    @callback
+    def _cancel_motion_off(self):
+        if self._motion_off_listener:
+            self._motion_off_listener()
+            self._motion_off_listener = None
+
+    @callback
+    def _async_motion_off(self, now=None):
+        self._motion_off_listener = None
+        self._state = False
+        self.async_write_ha_state()
+
+    @property
+    def _illumination_key(self):
+        if self._prop_illumination and self._prop_illumination.value_range:
+            return self._prop_illumination.full_name
+        return 'illumination'
+
+    # https://iot.mi.com/new/doc/embedded-development/ble/object-definition#%E6%9C%89%E4%BA%BA%E7%A7%BB%E5%8A%A8%E4%BA%8B%E4%BB%B6%EF%BC%88%E5%B8%A6%E5%85%89%E7%85%A7%EF%BC%89
+    def _ble_motion(self, val, tim, now, adt):
+        self.update_trigger_time(tim, adt)
+        dif = now - tim
+        sta = dif <= (self._motion_timeout or 60)
+        return self._illumination_key, val, sta
+
+    # https://iot.mi.com/new/doc/embedded-development/ble/object-definition#%E5%85%89%E7%85%A7%E5%BA%A6%E5%B1%9E%E6%80%A7
+    def _ble_lux(self, val, tim, now, adt):
+        return self._illumination_key, val, None
+
+    # https://iot.mi.com/new/doc/embedded-development/ble/object-definition#%E6%97%A0%E4%BA%BA%E7%A7%BB%E5%8A%A8%E5%B1%9E%E6%80%A7
+    def _ble_no_motion_duration(self, val, tim, now, adt):
+        if prop := self._miot_service.get_property('no_motion_duration'):
+            return prop.full_name, val, None
+        return 'no_motion_duration', val, None
+
+    # https://iot.mi.com/new/doc/embedded-development/ble/object-definition#%E5%85%89%E7%85%A7%E5%BC%BA%E5%BC%B1%E5%B1%9E%E6%80%A7
+    def _ble_illumination_level(self, val, tim, now, adt):
+        adt['light_strong'] = not not val
+        val = 'strong' if val else 'weak'
+        if self._prop_illumination and self._prop_illumination.value_list:
+            vid = self._prop_illumination.list_value(val)
+            if vid is not None:
+                adt[self._prop_illumination.full_name] = vid
+        return 'illumination_level', val, None
+
+    # https://iot.mi.com/new/doc/embedded-development/ble/object-definition#%E9%97%A8%E7%A3%81%E5%B1%9E%E6%80%A7
+    def _ble_magnet(self, val, tim, now, adt):
+        return None, val, val != 2
+
+    _HANDLERS = {
+        'event.15': _ble_motion,
+        'prop.4103': _ble_lux,
+        'prop.4119': _ble_no_motion_duration,
+        'prop.4120': _ble_illumination_level,
+        'prop.4121': _ble_magnet,
+    }
+
 
 class MiotToiletEntity(MiotBinarySensorEntity):
     def __init__(self, config, miot_service: MiotService):
@@ -271,42 +338,43 @@ class MiotToiletEntity(MiotBinarySensorEntity):
             self._prop_state = miot_service.get_property(
                 'mode', self._prop_state.name if self._prop_state else 'status',
             )
-        self._state_attrs.update({
-            'state_property': self._prop_state.full_name if self._prop_state else None,
-        })
+        self._state_attrs['state_property'] = self._prop_state.full_name if self._prop_state else None
 
-    async def async_update(self):
-        await super().async_update()
-        if not self._available:
-            return
-        add_fans = self._add_entities.get('fan')
-        pls = self._miot_service.get_properties(
+        self._seat = miot_service.spec.get_service('seat')
+        self._seat_heat_level = self._seat.get_property('heat_level') if self._seat else None
+        pls = miot_service.get_properties(
             'mode', 'washing_strength', 'nozzle_position', 'heat_level',
         )
-        seat = self._miot_service.spec.get_service('seat')
-        if seat:
-            prop = seat.get_property('heat_level')
-            if prop:
-                pls.append(prop)
-            else:
-                self._update_sub_entities(
-                    ['heating', 'deodorization'],
-                    [seat.name],
-                    domain='switch',
-                )
+        if self._seat_heat_level:
+            pls.append(self._seat_heat_level)
+        self._sub_prop_specs = []
         for p in pls:
             if not p.value_list and not p.value_range:
                 continue
-            if p.name in self._subs:
-                self._subs[p.name].update()
+            opt = None
+            if p.name in ['heat_level']:
+                opt = {
+                    'power_property': p.service.bool_property('heating'),
+                }
+            self._sub_prop_specs.append((p.name, p, opt))
+
+    async def async_update(self):
+        await super().async_update()
+        if not self._available:
+            return
+        add_fans = self._add_entities.get('fan')
+        if self._seat and not self._seat_heat_level:
+            self._update_sub_entities(
+                ['heating', 'deodorization'],
+                [self._seat.name],
+                domain='switch',
+            )
+        for pnm, p, opt in self._sub_prop_specs:
+            if pnm in self._subs:
+                self._subs[pnm].update()
             elif add_fans:
-                opt = None
-                if p.name in ['heat_level']:
-                    opt = {
-                        'power_property': p.service.bool_property('heating'),
-                    }
-                self._subs[p.name] = MiotModesSubEntity(self, p, opt)
-                add_fans([self._subs[p.name]])
+                self._subs[pnm] = MiotModesSubEntity(self, p, opt)
+                add_fans([self._subs[pnm]])
 
         add_switches = self._add_entities.get('switch')
         if self._prop_power:
@@ -325,39 +393,78 @@ class MiotToiletEntity(MiotBinarySensorEntity):
 class LumiBinarySensorEntity(MiotBinarySensorEntity):
     def __init__(self, config, miot_service: MiotService):
         super().__init__(config, miot_service)
+        self._time_start_offset = None
+
+    def _update_custom_configs(self):
+        super()._update_custom_configs()
+        self._time_start_offset = self.custom_config_integer('time_start_offset')
+
+    @property
+    def device_log_coordinator(self):
+        mic = self.miot_cloud
+        did = self.miot_did
+        if not self.hass or not did or not isinstance(mic, MiotCloud):
+            return None
+        eid = self._config.get('entry_id')
+        if not eid and self.platform and self.platform.config_entry:
+            eid = self.platform.config_entry.entry_id
+        crs = self.hass.data[DOMAIN].setdefault('device_log_coordinators', {}).setdefault(eid, {})
+        crd = crs.get(did)
+        if not crd:
+            # may run in update_before_add, before async_added_to_hass applied interval_seconds
+            self.update_custom_scan_interval()
+            crd = DeviceLogCoordinator(
+                self.hass, mic, did,
+                time_start_offset=self._time_start_offset,
+                update_interval=self.platform.scan_interval if self.platform else None,
+                backoff=self._miot_service.name not in ['motion_sensor'],
+            )
+            crs[did] = crd
+        return crd
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        if crd := self.device_log_coordinator:
+            self.async_on_remove(crd.async_add_listener(self._handle_device_log_update))
+
+    @callback
+    def _handle_device_log_update(self):
+        if not self._available:
+            return
+        self.update_from_device_log()
+        self.async_write_ha_state()
 
     async def async_update(self):
         await super().async_update()
         if not self._available:
             return
-        mic = self.miot_cloud
-        pes = dlg = None
-        if isinstance(mic, MiotCloud):
-            now = int(time.time())
-            ofs = self.custom_config_integer('time_start_offset') or -86400 * 3
-            dlg = await self.hass.async_add_executor_job(partial(
-                mic.get_last_device_data,
-                self.miot_did,
-                'device_log',
-                time_start=now + ofs,
-            ))
-            pes = json.loads(dlg or '[]')
+        crd = self.device_log_coordinator
+        if crd and self._time_start_offset:
+            crd.time_start_offset = self._time_start_offset
+        if crd and crd.data is None:
+            await crd.async_first_refresh()
+        self.update_from_device_log()
+
+    def update_from_device_log(self):
+        crd = self.device_log_coordinator
+        pes = crd.data if crd else None
+        dlg = crd.raw if crd else None
         adt = {}
         typ = None
-        dif = time.time()
+        now = time.time()
+        dif = now
         if pes and len(pes) >= 2:
             typ = pes[1][0]
             adt['trigger_type'] = typ
-            adt['trigger_time'] = int(pes[0] or 0)
-            adt['trigger_at'] = f'{datetime.fromtimestamp(adt["trigger_time"])}'
-            dif = time.time() - adt['trigger_time']
+            self.update_trigger_time(int(pes[0] or 0), adt)
+            dif = now - adt['trigger_time']
         if typ == 'prop.illumination':
             prop = self._miot_service.get_property('illumination')
             if prop:
                 adt[prop.full_name] = pes[1][1][0]
         self._state = None
         if typ == 'event.motion' or self._miot_service.name in ['motion_sensor']:
-            self._state = dif <= (self.custom_config_integer('motion_timeout') or 60)
+            self._state = dif <= (self._motion_timeout or 60)
         elif typ in ['event.open', 'event.close']:
             self._state = typ == 'event.open'
         elif typ in ['event.leak', 'event.no_leak']:
@@ -372,6 +479,63 @@ class LumiBinarySensorEntity(MiotBinarySensorEntity):
             self.update_attrs(adt)
 
 
+class DeviceLogCoordinator(DataUpdateCoordinator):
+    # poll less often the longer the device has been quiet,
+    # only for sticky states (door/leak), motion is only on within motion_timeout of the event
+    backoff_factor = 0.1
+    max_interval = timedelta(minutes=10)
+
+    def __init__(self, hass, cloud: MiotCloud, did, time_start_offset=None, update_interval=None, backoff=True):
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f'{DOMAIN}-device_log-{did}',
+            update_interval=update_interval,
+        )
+        self.cloud = cloud
+        self.did = did
+        self.time_start_offset = time_start_offset or -86400 * 3
+        self.base_interval = update_interval
+        self.backoff = backoff
+        self.last_event_type = None
+        self.last_event_time = None
+        self.raw = None
+        self._first_refresh = None
+
+    async def async_first_refresh(self):
+        # siblings updated before add share one fetch, retries are left to the scheduled refresh
+        if not self._first_refresh:
+            self._first_refresh = self.hass.async_create_task(self.async_refresh())
+        await self._first_refresh
+
+    async def _async_update_data(self):
+        now = int(time.time())
+        self.raw = await self.cloud.async_get_last_device_data(
+            self.did,
+            'device_log',
+            time_start=now + self.time_start_offset,
+        )
+        pes = json_loads(self.raw or '[]')
+        if pes and len(pes) >= 2:
+            self.last_event_type = pes[1][0]
+            self.last_event_time = int(pes[0] or 0) or None
+        self.update_adaptive_interval(now)
+        return pes
+
+    def update_adaptive_interval(self, now):
+        if not self.base_interval:
+            return
+        itv = self.base_interval
+        if self.backoff and self.last_event_type != 'event.motion':
+            # no event in the log window, quiet for at least the whole window
+            lst = self.last_event_time or (now + self.time_start_offset)
+            idl = timedelta(seconds=max(0, now - lst) * self.backoff_factor)
+            itv = min(max(itv, idl), max(itv, self.max_interval))
+        if itv != self.update_interval:
+            _LOGGER.debug('%s: Update device log interval: %s', self.name, itv)
+        self.update_interval = itv
+
+
 class MiotBinarySensorSubEntity(MiotPropertySubEntity, ToggleSubEntity, BinarySensorEntity):
     def __init__(self, parent, miot_property: MiotProperty, option=None):
         ToggleSubEntity.__init__(self, parent, miot_property.full_name, option)
@@ -1,4 +1,5 @@
 import logging
+import copy
 import requests
 import platform
 import random
@@ -265,6 +266,10 @@ class MiotSpec(MiotSpecInstance):
 
     @staticmethod
     async def async_from_type(hass, typ):
+        # specs are versioned urns, cached docs skip the 30-50 days store refresh until restart
+        cache = hass.data.setdefault(DOMAIN, {}).setdefault('_spec_cache', {})
+        if typ in cache:
+            return MiotSpec(copy.deepcopy(cache[typ]))
         url = f'https://miot-spec.org/miot-spec-v2/instance?type={typ}'
         fnm = f'{DOMAIN}/{typ}.json'
         if platform.system() == 'Windows':
@@ -288,6 +293,8 @@ class MiotSpec(MiotSpecInstance):
                 }
             dat['_updated_time'] = now
             await store.async_save(dat)
+        if dat.get('services'):
+            cache[typ] = copy.deepcopy(dat)
         return MiotSpec(dat)
 
     @staticmethod
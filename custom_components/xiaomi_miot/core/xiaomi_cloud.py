@@ -1,8 +1,10 @@
 import logging
+import asyncio
 import json
 import time
 import base64
 import hashlib
+import aiohttp
 import micloud
 import requests
 from datetime import datetime
@@ -11,8 +13,10 @@ from urllib.parse import urlparse
 
 from homeassistant.const import *
 from homeassistant.helpers.storage import Store
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
 from homeassistant.components import persistent_notification
 
+from .const import DOMAIN
 from .utils import RC4
 from micloud import miutils
 from micloud.micloudexception import MiCloudException
@@ -32,6 +36,7 @@ class MiotCloud(micloud.MiCloud):
         super().__init__(username, password)
         self.hass = hass
         self.default_server = country or 'cn'
+        self._batch_device_datas = None
 
     def get_properties_for_mapping(self, did, mapping: dict):
         pms = []
@@ -72,9 +77,10 @@ class MiotCloud(micloud.MiCloud):
         }) or {}
         return rdt.get('result')
 
-    def get_user_device_data(self, did, key, typ='prop', raw=False, **kwargs):
+    @staticmethod
+    def user_device_data_params(did, key, typ='prop', **kwargs):
         now = int(time.time())
-        params = {
+        return {
             'did': did,
             'key': key,
             'type': typ,
@@ -83,15 +89,33 @@ class MiotCloud(micloud.MiCloud):
             'limit': 5,
             **kwargs,
         }
+
+    def get_user_device_data(self, did, key, typ='prop', raw=False, **kwargs):
+        params = self.user_device_data_params(did, key, typ, **kwargs)
         rdt = self.request_miot_api('user/get_user_device_data', params) or {}
         return rdt if raw else rdt.get('result')
 
+    async def async_get_user_device_data(self, did, key, typ='prop', raw=False, **kwargs):
+        params = self.user_device_data_params(did, key, typ, **kwargs)
+        rdt = await self.async_request_miot_api('user/get_user_device_data', params) or {}
+        return rdt if raw else rdt.get('result')
+
     def get_last_device_data(self, did, key, typ='prop', **kwargs):
         kwargs['raw'] = False
         kwargs['limit'] = 1
         rls = self.get_user_device_data(did, key, typ, **kwargs) or [None]
+        return self.last_device_data_value(rls, kwargs.get('not_value'))
+
+    async def async_get_last_device_data(self, did, key, typ='prop', **kwargs):
+        kwargs['raw'] = False
+        kwargs['limit'] = 1
+        rls = await self.async_get_user_device_data(did, key, typ, **kwargs) or [None]
+        return self.last_device_data_value(rls, kwargs.get('not_value'))
+
+    @staticmethod
+    def last_device_data_value(rls: list, not_value=False):
         rdt = rls.pop(0) or {}
-        if kwargs.get('not_value'):
+        if not_value:
             return rdt
         val = rdt.get('value')
         if val is None:
@@ -136,6 +160,12 @@ class MiotCloud(micloud.MiCloud):
             _LOGGER.warning('Retry login xiaomi cloud failed: %s', self.username)
         return False
 
+    @property
+    def batch_device_datas(self):
+        if not self._batch_device_datas:
+            self._batch_device_datas = MiotCloudBatcher(self, 'device/batchdevicedatas')
+        return self._batch_device_datas
+
     async def async_request_api(self, *args, **kwargs):
         return await self.hass.async_add_executor_job(
             partial(self.request_miot_api, *args, **kwargs)
@@ -149,6 +179,69 @@ class MiotCloud(micloud.MiCloud):
             rsp = self.request_rc4_api(api, params, method)
         else:
             rsp = self.request(self.get_api_url(api), params)
+        return self.parse_miot_api_result(api, data, rsp, debug)
+
+    async def async_request_miot_api(self, api, data, method='POST', crypt=False, debug=True):
+        if crypt:
+            return await self.async_request_api(api, data, method=method, crypt=crypt, debug=debug)
+        params = {}
+        if data is not None:
+            params['data'] = self.json_encode(data)
+        rsp = await self.async_request(self.get_api_url(api), params)
+        return self.parse_miot_api_result(api, data, rsp, debug)
+
+    @property
+    def async_session(self):
+        dat = self.hass.data.setdefault(DOMAIN, {})
+        if not dat.get('cloud_session'):
+            # shared by all accounts, auth cookies are sent per request and never stored
+            dat['cloud_session'] = async_create_clientsession(
+                self.hass,
+                cookie_jar=aiohttp.DummyCookieJar(),
+            )
+        return dat['cloud_session']
+
+    async def async_request(self, url, params: dict):
+        # mirrors micloud.MiCloud.request (micloud 0.3/0.4), keep signing, headers and cookies in sync with it
+        if not self.service_token or not self.user_id:
+            raise MiCloudException('Cannot execute request. service token or userId missing. Make sure to login.')
+        nonce = miutils.gen_nonce()
+        signed_nonce = self.signed_nonce(nonce)
+        signature = miutils.gen_signature(url.replace('/app', ''), signed_nonce, nonce, params)
+        try:
+            async with self.async_session.post(
+                url,
+                data={
+                    'signature': signature,
+                    '_nonce': nonce,
+                    'data': params.get('data'),
+                },
+                headers={
+                    'X-XIAOMI-PROTOCAL-FLAG-CLI': 'PROTOCAL-HTTP2',
+                    'Content-Type': 'application/x-www-form-urlencoded',
+                    'User-Agent': self.useragent,
+                },
+                cookies={
+                    'userId': str(self.user_id),
+                    'yetAnotherServiceToken': self.service_token,
+                    'serviceToken': self.service_token,
+                    'locale': str(self.locale),
+                    'timezone': str(self.timezone),
+                    'is_daylight': str(time.daylight),
+                    'dst_offset': str(time.localtime().tm_isdst*60*60*1000),
+                    'channel': 'MI_APP_STORE',
+                },
+                timeout=aiohttp.ClientTimeout(total=30),
+            ) as response:
+                if response.status == 403:
+                    self.service_token = None
+                return await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            _LOGGER.warning('Error while executing request to %s :%s', url, exc)
+        return None
+
+    @staticmethod
+    def parse_miot_api_result(api, data, rsp, debug=True):
         try:
             rdt = json.loads(rsp)
             if debug:
@@ -401,3 +494,56 @@ class MiotCloud(micloud.MiCloud):
     @staticmethod
     def decrypt_data(pwd, data):
         return RC4(base64.b64decode(pwd)).init1024().crypt(base64.b64decode(data))
+
+
+class MiotCloudBatcher:
+    def __init__(self, cloud: MiotCloud, api, delay=0.05, max_size=20):
+        self.cloud = cloud
+        self.api = api
+        self.delay = delay
+        self.max_size = max_size
+        self._queue = {}
+        self._timer = None
+
+    async def async_enqueue(self, did, props):
+        fut = self.cloud.hass.loop.create_future()
+        itm = self._queue.setdefault(did, {'props': [], 'futures': []})
+        itm['props'].extend(p for p in props if p not in itm['props'])
+        itm['futures'].append(fut)
+        if len(self._queue) >= self.max_size:
+            self._flush()
+        elif not self._timer:
+            self._timer = self.cloud.hass.loop.call_later(self.delay, self._flush)
+        return await fut
+
+    def _flush(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        dls = list(self._queue.keys())
+        while dls:
+            bat = {
+                did: self._queue.pop(did)
+                for did in dls[:self.max_size]
+            }
+            dls = dls[self.max_size:]
+            self.cloud.hass.async_create_task(self._async_request(bat))
+
+    async def _async_request(self, bat: dict):
+        pms = [
+            {'did': did, 'props': itm['props']}
+            for did, itm in bat.items()
+        ]
+        try:
+            rdt = await self.cloud.async_request_miot_api(self.api, pms) or {}
+        except Exception as exc:  # noqa
+            for itm in bat.values():
+                for fut in itm['futures']:
+                    if not fut.done():
+                        fut.set_exception(exc)
+            return
+        res = rdt.get('result') or {}
+        for did, itm in bat.items():
+            for fut in itm['futures']:
+                if not fut.done():
+                    fut.set_result(res.get(did) or {})